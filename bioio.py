@@ -10,15 +10,28 @@ import re
 import logging
 import resource
 import logging.handlers
+import threading
+import Queue
+import copy
+import weakref
+import atexit
 import tempfile
+import tarfile
 import random
 import math
+import time
+import mmap
 import shutil
+import shlex
+import signal
+import string
+import base64
+import itertools
+import collections
 from optparse import OptionParser
+from operator import attrgetter
 from tree import BinaryTree
-from misc import close
 import subprocess
-import array
 
 DEFAULT_DISTANCE = 0.001
 
@@ -35,7 +48,7 @@ loggingFormatter = logging.Formatter('%(asctime)s %(levelname)s %(lineno)s %(mes
 def __setDefaultLogger():
     l = logging.getLogger()
     for handler in l.handlers: #Do not add a duplicate handler unless needed
-        if handler.stream == sys.stderr:
+        if getattr(handler, "stream", None) == sys.stderr:
             return l
     handler = logging.StreamHandler(sys.stderr)
     l.addHandler(handler) 
@@ -49,19 +62,89 @@ def redirectLoggerStreamHandlers(oldStream, newStream):
     """Redirect the stream of a stream handler to a different stream
     """
     for handler in list(logger.handlers): #Remove old handlers
-        if handler.stream == oldStream:
+        if getattr(handler, "stream", None) == oldStream:
             handler.close()
             logger.removeHandler(handler)
     for handler in logger.handlers: #Do not add a duplicate handler 
-        if handler.stream == newStream:
+        if getattr(handler, "stream", None) == newStream:
            return
     logger.addHandler(logging.StreamHandler(newStream))
 
 def getLogLevelString():
     return logLevelString
 
+class _QueueHandler(logging.Handler):
+    """Puts log records on a queue, from which a separate thread passes them to the 
+    given handler, so that logging does not block the caller on writes to disk.
+    
+    Attributes not defined here (e.g. baseFilename, stream) are those of the given handler.
+    """
+    def __init__(self, handler):
+        logging.Handler.__init__(self)
+        self.handler = handler
+        self.pid = os.getpid() #The writer thread does not survive a fork
+        self.queue = Queue.Queue()
+        self.thread = threading.Thread(target=self.__handleRecords)
+        self.thread.setDaemon(True)
+        self.thread.start()
+        _queueHandlers.add(self)
+    
+    def __handleRecords(self):
+        record = self.queue.get()
+        while record is not None:
+            self.handler.handle(record)
+            record = self.queue.get()
+    
+    def __getattr__(self, name):
+        if name == "handler": #Not yet set, avoid recursing
+            raise AttributeError(name)
+        return getattr(self.handler, name)
+    
+    def emit(self, record):
+        if os.getpid() != self.pid: #In a forked child, where the writer thread is gone
+            #The thread may have held the handler's lock when we forked, so make a new one
+            self.pid = os.getpid()
+            self.handler.createLock()
+        if not self.thread.isAlive(): #Nothing drains the queue, so handle the record here
+            self.handler.handle(record)
+            return
+        try:
+            #Format now, the arguments may have changed by the time the record is handled.
+            #Change a copy, the record is shared with the other handlers
+            record = copy.copy(record)
+            record.msg = self.format(record)
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            self.queue.put(record)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+    
+    def close(self):
+        if self.thread.isAlive():
+            self.queue.put(None)
+            self.thread.join()
+        self.handler.close()
+        logging.Handler.close(self)
+        _queueHandlers.discard(self)
+
+_queueHandlers = weakref.WeakSet() #The open queue handlers
+
+def __closeQueueHandlers():
+    """Makes sure queued records are written out at exit.
+    """
+    for handler in list(_queueHandlers):
+        handler.close()
+atexit.register(__closeQueueHandlers)
+
 __loggingFiles = []
 def addLoggingFileHandler(fileName, rotatingLogging=False):
+    """Adds a handler logging to the given file, returning it. The file handler is 
+    wrapped so that records are written by a separate thread, its attributes 
+    (baseFilename, stream, doRollover etc.) are available on the returned handler.
+    """
     if fileName in __loggingFiles:
         return
     __loggingFiles.append(fileName)
@@ -69,6 +152,7 @@ def addLoggingFileHandler(fileName, rotatingLogging=False):
         handler = logging.handlers.RotatingFileHandler(fileName, maxBytes=1000000, backupCount=1)
     else:
         handler = logging.FileHandler(fileName)
+    handler = _QueueHandler(handler)
     logger.addHandler(handler)
     return handler
     
@@ -91,14 +175,9 @@ def logFile(fileName, printFunction=logger.info):
     """
     printFunction("Reporting file: %s" % fileName)
     shortName = fileName.split("/")[-1]
-    fileHandle = open(fileName, 'r')
-    line = fileHandle.readline()
-    while line != '':
-        if line[-1] == '\n':
-            line = line[:-1]
-        printFunction("%s:\t%s" % (shortName, line))
-        line = fileHandle.readline()
-    fileHandle.close()
+    with open(fileName, 'r') as fileHandle:
+        for line in fileHandle:
+            printFunction("%s:\t%s" % (shortName, line.rstrip("\n")))
     
 def addLoggingOptions(parser):
     """Adds logging options to an optparse.OptionsParser
@@ -156,9 +235,17 @@ def setLoggingFromOptions(options):
 #########################################################
 #########################################################
 
+def _useShell(command):
+    """Commands given as strings are run by the shell, commands given as a list 
+    of arguments are exec'd directly, saving the cost of starting a shell.
+    """
+    return isinstance(command, basestring)
+
 def system(command):
+    """Runs a command, which may be a shell command string or a list of arguments.
+    """
     logger.debug("Running the command: %s" % command)
-    sts = subprocess.call(command, shell=True, bufsize=-1, stdout=sys.stdout, stderr=sys.stderr)
+    sts = subprocess.call(command, shell=_useShell(command), bufsize=-1, stdout=sys.stdout, stderr=sys.stderr)
     if sts != 0:
         raise RuntimeError("Command: %s exited with non-zero status %i" % (command, sts))
     return sts
@@ -168,22 +255,25 @@ def popen(command, tempFile):
     """
     fileHandle = open(tempFile, 'w')
     logger.debug("Running the command: %s" % command)
-    sts = subprocess.call(command, shell=True, stdout=fileHandle, stderr=sys.stderr, bufsize=-1)
+    sts = subprocess.call(command, shell=_useShell(command), stdout=fileHandle, stderr=sys.stderr, bufsize=-1)
     fileHandle.close()
     if sts != 0:
         raise RuntimeError("Command: %s exited with non-zero status %i" % (command, sts))
     return sts
 
-def popenCatch(command, stdinString=None):
+def popenCatch(command, stdinString=None, bufsize=2**20):
     """Runs a command and return standard out.
+    
+    Standard out is read through a buffer of bufsize bytes, so large outputs are 
+    read with fewer system calls.
     """
     logger.debug("Running the command: %s" % command)
     if stdinString != None:
-        process = subprocess.Popen(command, shell=True, 
-                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=sys.stderr, bufsize=-1)
+        process = subprocess.Popen(command, shell=_useShell(command), 
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=sys.stderr, bufsize=bufsize)
         output, nothing = process.communicate(stdinString)
     else:
-        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=sys.stderr, bufsize=-1)
+        process = subprocess.Popen(command, shell=_useShell(command), stdout=subprocess.PIPE, stderr=sys.stderr, bufsize=bufsize)
         output, nothing = process.communicate() #process.stdout.read().strip()
     sts = process.wait()
     if sts != 0:
@@ -194,7 +284,7 @@ def popenPush(command, stdinString=None):
     if stdinString == None:
         system(command)
     else:
-        process = subprocess.Popen(command, shell=True, 
+        process = subprocess.Popen(command, shell=_useShell(command), 
                                    stdin=subprocess.PIPE, stderr=sys.stderr, bufsize=-1)
         process.communicate(stdinString)
         sts = process.wait()
@@ -203,17 +293,56 @@ def popenPush(command, stdinString=None):
 
 def spawnDaemon(command):
     """Launches a command as a daemon.  It will need to be explicitly killed
+    
+    Like sonLib_daemonize.py, the command is not run in a shell, it is split
+    into arguments with shlex.split and exec'd directly by a double forked child.
     """
-    return system("sonLib_daemonize.py \'%s\'" % command)
+    logger.debug("Spawning the daemon: %s" % command)
+    argv = shlex.split(command)
+    assert len(argv) > 0
+    pid = os.fork()
+    if pid == 0:
+        try:
+            #Start a new session and fork again, so the daemon can never reacquire a terminal
+            os.setsid()
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            if os.fork() == 0:
+                os.chdir("/")
+                os.umask(0)
+                #Redirect the standard I/O file descriptors to /dev/null and close everything else
+                devNull = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(devNull, fd)
+                maxfd = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+                if maxfd == resource.RLIM_INFINITY:
+                    maxfd = 1024
+                os.closerange(3, maxfd)
+                os.execvp(argv[0], argv)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    return 0
+
+#Seconds for which a sample of the resource usage is reused before getrusage is called again
+RESOURCE_USAGE_CACHE_TIME = 0.05
+__resourceUsage = (None, None)
 
 def getTotalCpuTimeAndMemoryUsage():
     """Gives the total cpu time and memory usage of itself and its children. 
+    
+    Samples are cached for RESOURCE_USAGE_CACHE_TIME seconds.
     """
-    me = resource.getrusage(resource.RUSAGE_SELF)
-    childs = resource.getrusage(resource.RUSAGE_CHILDREN)
-    totalCpuTime = me.ru_utime+me.ru_stime+childs.ru_utime+childs.ru_stime
-    totalMemoryUsage = me.ru_maxrss+ me.ru_maxrss
-    return totalCpuTime, totalMemoryUsage
+    global __resourceUsage
+    sampleTime, usage = __resourceUsage
+    now = time.time()
+    if sampleTime is None or not (0 <= now - sampleTime < RESOURCE_USAGE_CACHE_TIME):
+        me = resource.getrusage(resource.RUSAGE_SELF)
+        childs = resource.getrusage(resource.RUSAGE_CHILDREN)
+        totalCpuTime = me.ru_utime+me.ru_stime+childs.ru_utime+childs.ru_stime
+        totalMemoryUsage = me.ru_maxrss+childs.ru_maxrss
+        usage = totalCpuTime, totalMemoryUsage
+        __resourceUsage = now, usage
+    return usage
 
 def getTotalCpuTime():
     """Gives the total cpu time, including the children. 
@@ -299,10 +428,16 @@ def saveInputs(savedInputsDir, listOfFilesAndDirsToSave):
     for fileName in listOfFilesAndDirsToSave:
         if os.path.isfile(fileName):
             copiedFileName = os.path.join(savedInputsDir, os.path.split(fileName)[-1])
-            system("cp %s %s" % (fileName, copiedFileName))
+            shutil.copy(fileName, copiedFileName)
         else:
             copiedFileName = os.path.join(savedInputsDir, os.path.split(fileName)[-1]) + ".tar"
-            system("tar -cf %s %s" % (copiedFileName, fileName))
+            try:
+                with tarfile.open(copiedFileName, 'w') as tarFile:
+                    tarFile.add(fileName)
+            except:
+                if os.path.exists(copiedFileName): #Do not leave a truncated tar behind
+                    os.remove(copiedFileName)
+                raise
         createdFiles.append(copiedFileName)
     return createdFiles
 
@@ -379,9 +514,11 @@ def nameValue(name, value, valueType=str, quotes=False):
         return ""
     if value is None:
         return ""
+    if valueType is not str: #%s formatting already converts the value to a string
+        value = valueType(value)
     if quotes:
-        return "--%s '%s'" % (name, valueType(value))  
-    return "--%s %s" % (name, valueType(value))    
+        return "--%s '%s'" % (name, value)  
+    return "--%s %s" % (name, value)    
 
 #########################################################
 #########################################################
@@ -393,8 +530,11 @@ def nameValue(name, value, valueType=str, quotes=False):
 
 def getRandomAlphaNumericString(length=10):
     """Returns a random alpha numeric string of the given length.
+    
+    The string is lower case base32 (a-z, 2-7) drawn from os.urandom, so strings 
+    made by forked processes sharing the random module's state still differ.
     """
-    return "".join([ random.choice('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz') for i in xrange(0, length) ])
+    return base64.b32encode(os.urandom(length))[:length].lower()
     
 def getTempFile(suffix="", rootDir=None):
     """Returns a string representing a temporary file, that must be manually deleted
@@ -449,7 +589,9 @@ class TempFileTree:
         #Dynamic variables
         self.tempDir = rootDir
         self.level = 0
-        self.filesInDir = 1
+        self.filesInDir = len(os.listdir(rootDir))
+        #Number of files in each of the parent dirs of tempDir, keyed by path
+        self.filesInParentDirs = {}
         #These two variables will only refer to the existance of this class instance.
         self.tempFilesCreated = 0
         self.tempFilesDestroyed = 0
@@ -475,7 +617,7 @@ class TempFileTree:
                 #reduce level number by one, chop off top of tempDir.
                 self.level -= 1
                 self.tempDir = os.path.split(self.tempDir)[0]
-                self.filesInDir = len(os.listdir(self.tempDir))
+                self.filesInDir = self.filesInParentDirs.pop(self.tempDir)
             else:
                 if self.level == self.levelNo-1:
                     self.filesInDir += 1
@@ -486,6 +628,7 @@ class TempFileTree:
                         return getTempFile(suffix=suffix, rootDir=self.tempDir)
                 else:
                     #mk new dir, and add to tempDir path, inc the level buy one.
+                    self.filesInParentDirs[self.tempDir] = self.filesInDir + 1
                     self.tempDir = getTempDirectory(rootDir=self.tempDir)
                     open(os.path.join(self.tempDir, "lock"), 'w').close() #Add the lock file
                     self.level += 1
@@ -504,6 +647,8 @@ class TempFileTree:
                 except OSError:
                     break
                 baseDir = os.path.split(baseDir)[0]
+                if baseDir in self.filesInParentDirs:
+                    self.filesInParentDirs[baseDir] -= 1
                 if baseDir == self.rootDir:
                     break
     
@@ -533,7 +678,6 @@ class TempFileTree:
             os.rmdir(tempDir)
         except OSError:
             shutil.rmtree(tempDir)
-            #system("rm -rf %s" % tempDir)
         self.__destroyFile(tempDir)
    
     def listFiles(self):
@@ -558,7 +702,7 @@ class TempFileTree:
     def destroyTempFiles(self):
         """Destroys all temp temp file hierarchy, getting rid of all files.
         """
-        os.system("rm -rf %s" % self.rootDir)
+        shutil.rmtree(self.rootDir, ignore_errors=True)
         logger.debug("Temp files created: %s, temp files actively destroyed: %s" % (self.tempFilesCreated, self.tempFilesDestroyed))  
 
 #########################################################
@@ -621,51 +765,79 @@ def fastaEncodeHeader(attributes):
         assert len(str(i).split()) == 1
     return "|".join([ str(i) for i in attributes ])
 
+_FASTA_DELETE_CHARS = " \t\r\n"
+_FASTA_INVALID_CHAR_RE = re.compile("[^A-Za-z\\-]")
+
+def _fastaJoinSequence(lines):
+    """Joins the lines of a fasta record into a single sequence string, 
+    stripping white space and checking the sequence is valid.
+    """
+    seq = "".join(lines).translate(None, _FASTA_DELETE_CHARS)
+    assert _FASTA_INVALID_CHAR_RE.search(seq) is None #For safety and sanity I only allows roman alphabet characters in fasta sequences. 
+    return seq
+
 def fastaRead(fileHandle):
     """iteratively a sequence for each '>' it encounters, ignores '#' lines
     """
-    line = fileHandle.readline()
-    while line != '':
+    name = None
+    lines = []
+    for line in fileHandle:
         if line[0] == '>':
+            if name is not None:
+                yield name, _fastaJoinSequence(lines)
             name = line[1:-1]
-            line = fileHandle.readline()
-            seq = array.array('c')
-            while line != '' and line[0] != '>':
-                if line[0] != '#':
-                    seq.extend([ i for i in line[:-1] if i != '\t' and i != ' ' ])
-                line = fileHandle.readline()
-            for i in seq:
-                assert (i >= 'A' and i <= 'Z') or (i >= 'a' and i <= 'z') or i == '-' #For safety and sanity I only allows roman alphabet characters in fasta sequences. 
-            yield name, seq.tostring()
-        else:
-            line = fileHandle.readline()
+            lines = []
+        elif name is not None and line[0] != '#':
+            lines.append(line)
+    if name is not None:
+        yield name, _fastaJoinSequence(lines)
 
 def fastaWrite(fileHandle, name, seq):
     """Writes out fasta file
     """
     assert seq.__class__ == "".__class__
-    for i in seq:
-        assert (i >= 'A' and i <= 'Z') or (i >= 'a' and i <= 'z') or i == '-' #For safety and sanity I only allows roman alphabet characters in fasta sequences. 
+    assert _FASTA_INVALID_CHAR_RE.search(seq) is None #For safety and sanity I only allows roman alphabet characters in fasta sequences. 
     fileHandle.write(">%s\n%s\n" % (name, seq))
 
-def _getMultiFastaOffsets(fasta):
-    """Reads in columns of multiple alignment and returns them iteratively
+def _readMultiFastaOffsets(fasta):
+    """Scans the multi-fasta file for the offsets of the sequences following each header
     """
     f = open(fasta, 'r')
-    i = 0
-    j = f.read(1)
     l = []
-    while j != '':
-        i += 1
-        if j == '>':
+    if os.fstat(f.fileno()).st_size > 0:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        i = mm.find('>')
+        while i != -1:
+            i = mm.find('\n', i)
+            if i == -1: #Header with no terminating new line
+                l.append(len(mm))
+                break
             i += 1
-            while f.read(1) != '\n':
-                i += 1
             l.append(i)
-        j = f.read(1)
+            i = mm.find('>', i)
+        mm.close()
     f.close()
     return l
 
+#Number of multi-fasta files whose sequence offsets are cached
+MULTI_FASTA_OFFSETS_CACHE_SIZE = 16
+__multiFastaOffsets = collections.OrderedDict()
+
+def _getMultiFastaOffsets(fasta):
+    """Gets the offsets of the sequences in a multi-fasta file, caching them so 
+    that repeated reads of an unchanged file are not rescanned.
+    """
+    stat = os.stat(fasta)
+    key = (os.path.abspath(fasta), stat.st_ino, stat.st_size, stat.st_mtime)
+    if key in __multiFastaOffsets:
+        l = __multiFastaOffsets.pop(key) #Reinserted below, to mark it as most recently used
+    else:
+        l = _readMultiFastaOffsets(fasta)
+        while len(__multiFastaOffsets) >= MULTI_FASTA_OFFSETS_CACHE_SIZE:
+            __multiFastaOffsets.popitem(last=False)
+    __multiFastaOffsets[key] = l
+    return l[:]
+
 def fastaReadHeaders(fasta):
     """Returns a list of fasta header lines, excluding 
     """
@@ -686,31 +858,22 @@ def fastaAlignmentRead(fasta, mapFn=(lambda x : x), l=None):
     """
     if l is None:
         l = _getMultiFastaOffsets(fasta)
-    else:
-        l = l[:]
-    seqNo = len(l)
-    for i in xrange(0, seqNo):
-        j = open(fasta, 'r')
-        j.seek(l[i])
-        l[i] = j
-    column = [sys.maxint]*seqNo
-    if seqNo != 0:
-        while True:
-            for j in xrange(0, seqNo):
-                i = l[j].read(1)
-                while i == '\n':
-                    i = l[j].read(1)
-                column[j] = i
-            if column[0] == '>' or column[0] == '':
-                for j in xrange(1, seqNo):
-                    assert column[j] == '>' or column[j] == ''
-                break
-            for j in xrange(1, seqNo):
-                 assert column[j] != '>' and column[j] != ''
-                 column[j] = mapFn(column[j])
-            yield column[:]
-    for i in l:
-        i.close()
+    if len(l) == 0:
+        return
+    f = open(fasta, 'r')
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    seqs = []
+    for start in l:
+        end = mm.find('>', start)
+        if end == -1:
+            end = len(mm)
+        seqs.append(mm[start:end].translate(None, "\n\r"))
+    mm.close()
+    f.close()
+    for seq in seqs[1:]:
+        assert len(seq) == len(seqs[0]) #Sequences in the alignment must all be of the same length
+    for column in itertools.izip(*seqs):
+        yield [ column[0] ] + [ mapFn(i) for i in column[1:] ] #The first sequence is not mapped
 
 def fastaAlignmentWrite(columnAlignment, names, seqNo, fastaFile, 
                         filter=lambda x : True):
@@ -719,11 +882,12 @@ def fastaAlignmentWrite(columnAlignment, names, seqNo, fastaFile,
     """
     fastaFile = open(fastaFile, 'w')
     columnAlignment = [ i for i in columnAlignment if filter(i) ]
+    if len(columnAlignment) > 0:
+        rows = zip(*columnAlignment) #Transpose the columns into sequences
+    else:
+        rows = [ () ]*seqNo
     for seq in xrange(0, seqNo):
-        fastaFile.write(">%s\n" % names[seq])
-        for column in columnAlignment:
-            fastaFile.write(column[seq])
-        fastaFile.write("\n")
+        fastaFile.write(">%s\n%s\n" % (names[seq], "".join(rows[seq])))
     fastaFile.close()
 
 def getRandomSequence(length=500):
@@ -736,41 +900,62 @@ def getRandomSequence(length=500):
             "".join([ random.choice([ 'A', 'C', 'T', 'G', 'A', 'C', 'T', 'G', 'A', 'C', 'T', 'G', 'A', 'C', 'T', 'G', 'A', 'C', 'T', 'G', 'N' ]) for i in xrange((int)(random.random() * length))]))
 
 def _expLength(i=0, prob=0.95):
-    if random.random() >= prob:
-        return _expLength(i+1)
-    return i
+    """Adds to i a geometrically distributed length, where each extension 
+    is stopped with the given probability, sampled by inverting the CDF.
+    """
+    assert prob > 0.0
+    if prob >= 1.0:
+        return i
+    return i + int(math.log(1.0 - random.random()) / math.log(1.0 - prob))
 
 def mutateSequence(seq, distance):
     """Mutates the DNA sequence for use in testing.
+    
+    Rather than testing every base for a mutation, the number of unmutated bases 
+    before the next mutated base is sampled and copied as a single slice.
     """
     subProb=distance
     inProb=0.05*distance
     deProb=0.05*distance
     contProb=0.9
+    #Probability that a base has a substitution, insertion or deletion (or some combination)
+    eventProb = 1.0 - (1.0-subProb)*(1.0-inProb)*(1.0-deProb)
+    if eventProb <= 0.0:
+        return "".join(seq)
+    indelProb = 1.0 - (1.0-inProb)*(1.0-deProb)
     l = []
     bases = [ 'A', 'C', 'T', 'G' ]
     i=0
     while i < len(seq):
-        if random.random() < subProb:
+        j = _expLength(i, eventProb)
+        l.append(seq[i:j])
+        if j >= len(seq):
+            break
+        i = j
+        #Choose the events at base i, given that at least one occurs
+        if random.random()*eventProb < subProb:
             l.append(random.choice(bases))
+            insertion = random.random() < inProb
+            deletion = random.random() < deProb
         else:
             l.append(seq[i])
-        if random.random() < inProb:
-            l += getRandomSequence(_expLength(0, contProb))[1]
-        if random.random() < deProb:
-            i += int(_expLength(0, contProb))
+            insertion = random.random()*indelProb < inProb
+            deletion = not insertion or random.random() < deProb
+        if insertion:
+            l.append(getRandomSequence(_expLength(0, contProb))[1])
+        if deletion:
+            i += _expLength(0, contProb)
         i += 1
     return "".join(l)
 
+_REVERSE_COMPLEMENT_TABLE = string.maketrans("ACGTacgt", "TGCAtgca")
+#unicode.translate takes a map of code points rather than a string table
+_UNICODE_REVERSE_COMPLEMENT_TABLE = dict((ord(i), ord(j)) for i, j in zip("ACGTacgt", "TGCAtgca"))
+
 def reverseComplement(seq):
-    seq = list(seq)
-    seq.reverse()
-    dNA = { 'A':'T', 'T':'A', 'C':'G', 'G':'C', 'a':'t', 't':'a', 'c':'g', 'g':'c' }
-    def fn(i):
-        if i in dNA:
-            return dNA[i]
-        return i
-    return "".join([ fn(i) for i in seq ])
+    if isinstance(seq, unicode):
+        return seq[::-1].translate(_UNICODE_REVERSE_COMPLEMENT_TABLE)
+    return seq[::-1].translate(_REVERSE_COMPLEMENT_TABLE)
  
         
 #########################################################
@@ -781,89 +966,87 @@ def reverseComplement(seq):
 #########################################################
 #########################################################
        
+#Brackets, commas and colons are tokens in themselves, white space and ';' separate tokens
+_NEWICK_TOKEN_RE = re.compile("[(),:]|[^\\s(),:;]+")
+_DISTANCE_KEY = attrgetter("distance")
+
 def newickTreeParser(newickTree, defaultDistance=DEFAULT_DISTANCE, \
                      sortNonBinaryNodes=False, reportUnaryNodes=False):
     """
     lax newick tree parser
     """
-    newickTree = newickTree.replace("(", " ( ")
-    newickTree = newickTree.replace(")", " ) ")
-    newickTree = newickTree.replace(":", " : ")
-    newickTree = newickTree.replace(";", "")
-    newickTree = newickTree.replace(",", " , ")
-    
-    newickTree = re.compile("[\s]*").split(newickTree)
-    while "" in newickTree:
-        newickTree.remove("")
-    def fn(newickTree, i):
-        if i[0] < len(newickTree):
-            if newickTree[i[0]] == ':':
-                d = float(newickTree[i[0]+1])
-                i[0] += 2
-                return d
-        return defaultDistance
-    def fn2(newickTree, i):
-        if i[0] < len(newickTree):
-            j = newickTree[i[0]]
+    newickTree = _NEWICK_TOKEN_RE.findall(newickTree)
+    tokenNo = len(newickTree)
+    def fn(i):
+        #Parses the optional iD and distance at i, returning them and the next position
+        iD = None
+        if i < tokenNo:
+            j = newickTree[i]
             if j != ':' and j != ')' and j != ',':
-                i[0] += 1
-                return j
-        return None
-    def fn3(newickTree, i):
-        if newickTree[i[0]] == '(':
-            #subTree1 = None
-            subTreeList = []
-            i[0] += 1
-            k = []
-            while newickTree[i[0]] != ')':
-                if newickTree[i[0]] == ',':
-                    i[0] += 1
-                subTreeList.append(fn3(newickTree, i))
-            i[0] += 1
-            def cmp(i, j):
-                if i.distance < j.distance:
-                    return -1
-                if i.distance > j.distance:
-                    return 1
-                return 0
+                iD = j
+                i += 1
+        if i < tokenNo and newickTree[i] == ':':
+            return iD, float(newickTree[i+1]), i+2
+        return iD, defaultDistance, i
+    stack = [] #The lists of subtrees of the internal nodes currently open
+    i = 0
+    while True:
+        if newickTree[i] == '(':
+            stack.append([])
+            i += 1
+        else:
+            leafID, distance, i = fn(i)
+            subTree = BinaryTree(distance, False, None, None, leafID)
+            if len(stack) == 0:
+                return subTree
+            stack[-1].append(subTree)
+        while newickTree[i] == ')': #Close the internal nodes that are complete
+            i += 1
+            subTreeList = stack.pop()
             if sortNonBinaryNodes:
-                subTreeList.sort(cmp)
-            subTree1 = subTreeList[0]
+                subTreeList.sort(key=_DISTANCE_KEY)
+            subTree = subTreeList[0]
+            iD, distance, i = fn(i)
             if len(subTreeList) > 1:
                 for subTree2 in subTreeList[1:]:
-                    subTree1 = BinaryTree(0.0, True, subTree1, subTree2, None)
-                subTree1.iD = fn2(newickTree, i)
-                subTree1.distance += fn(newickTree, i)
+                    subTree = BinaryTree(0.0, True, subTree, subTree2, None)
+                subTree.iD = iD
             elif reportUnaryNodes:
-                subTree1 = BinaryTree(0.0, True, subTree1, None, None)
-                subTree1.iD = fn2(newickTree, i)
-                subTree1.distance += fn(newickTree, i)
-            else:
-                fn2(newickTree, i)
-                subTree1.distance += fn(newickTree, i)
-            return subTree1
-        leafID = fn2(newickTree, i)
-        return BinaryTree(fn(newickTree, i), False, None, None, leafID)
-    return fn3(newickTree, [0])
+                subTree = BinaryTree(0.0, True, subTree, None, iD)
+            subTree.distance += distance
+            if len(stack) == 0:
+                return subTree
+            stack[-1].append(subTree)
+        if newickTree[i] == ',':
+            i += 1
 
 def printBinaryTree(binaryTree, includeDistances, dontStopAtID=True, distancePrintFn=(lambda f : "%f" % f)):
-    def fn(binaryTree):
-        #print " tree Node ", binaryTree.left, binaryTree.right, binaryTree.distance, binaryTree.internal, binaryTree.iD 
-        if binaryTree.iD is not None:
-            iD = str(binaryTree.iD)
-        else:
-            iD = ''
-        if binaryTree.internal and (dontStopAtID or binaryTree.iD is None):
+    parts = []
+    stack = [ binaryTree ] #Nodes still to print, interleaved with the strings that follow them
+    #Local names are quicker to look up in the loop
+    partsAppend, stackAppend, stackPop = parts.append, stack.append, stack.pop
+    isInstance = isinstance
+    while stack:
+        binaryTree = stackPop()
+        if isInstance(binaryTree, basestring):
+            partsAppend(binaryTree)
+            continue
+        nodeID = binaryTree.iD
+        isComposite = binaryTree.internal and (dontStopAtID or nodeID is None)
+        iD = str(nodeID) if nodeID is not None else ''
+        if includeDistances:
+            iD = iD + ':' + distancePrintFn(binaryTree.distance)
+        if isComposite:
+            partsAppend('(')
+            stackAppend(')' + iD)
             if binaryTree.right is not None:
-                s = '(' + fn(binaryTree.left) + ',' + fn(binaryTree.right) + ')' + iD
-            else:
-                s = '(' + fn(binaryTree.left) + ')' + iD 
+                stackAppend(binaryTree.right)
+                stackAppend(',')
+            stackAppend(binaryTree.left)
         else:
-            s = iD
-        if includeDistances:
-            return s + ':' + distancePrintFn(binaryTree.distance)
-        return s
-    return fn(binaryTree) + ';'
+            partsAppend(iD)
+    partsAppend(';')
+    return "".join(parts)
 
 #########################################################
 #########################################################
@@ -879,22 +1062,19 @@ def pWMRead(fileHandle, alphabetSize=4):
     """
     lines = fileHandle.readlines()
     assert len(lines) == alphabetSize
-    l = [ [ float(i) ] for i in lines[0].split() ]
-    for line in lines[1:]:
-        l2 = [ float(i) for i in line.split() ]
-        assert len(l) == len(l2)
-        for i in xrange(0, len(l)):
-            l[i].append(l2[i])
-    for i in xrange(0, len(l)):
-        j = sum(l[i]) + 0.0
-        l[i] = [ k/j for k in l[i] ]
+    rows = [ map(float, line.split()) for line in lines ]
+    for row in rows[1:]:
+        assert len(row) == len(rows[0])
+    l = []
+    for column in zip(*rows): #Transpose the rows into columns and normalise them
+        j = sum(column)
+        l.append([ k/j for k in column ])
     return l
 
 def pWMWrite(fileHandle, pWM, alphabetSize=4):
     """Writes file in standard PWM format, is reverse of pWMParser
     """
-    for i in xrange(0, alphabetSize):
-        fileHandle.write("%s\n" % ' '.join([ str(pWM[j][i]) for j in xrange(0, len(pWM)) ]))
+    fileHandle.write("".join([ "%s\n" % ' '.join([ str(column[i]) for column in pWM ]) for i in xrange(0, alphabetSize) ]))
 
 #########################################################
 #########################################################
@@ -913,7 +1093,9 @@ def _checkSegment(start, end, strand):
         assert end <= start
     assert strand == True or strand == False
     
-class AlignmentOperation:
+class AlignmentOperation(object):
+    __slots__ = ('type', 'length', 'score')
+    
     def __init__(self, opType, length, score):
         self.type = opType
         self.length = length
@@ -922,12 +1104,22 @@ class AlignmentOperation:
     def __eq__(self, op):
         if op is None:
             return False
-        return self.type == op.type and self.length == op.length and close(self.score, op.score, 0.0001)
+        return self.type == op.type and self.length == op.length and op.score - 0.0001 <= self.score <= op.score + 0.0001
     
     def __str__(self):
         return "Type: %i Length: %i Score: %f" % (self.type, self.length, self.score)
+    
+    def __getstate__(self): #Pickling with protocols 0 and 1 needs this, as the class has slots
+        return self.type, self.length, self.score
+    
+    def __setstate__(self, state):
+        self.type, self.length, self.score = state
 
-class PairwiseAlignment:
+class PairwiseAlignment(object):
+    __slots__ = ('contig1', 'start1', 'end1', 'strand1', 
+                 'contig2', 'start2', 'end2', 'strand2', 
+                 'score', 'operationList')
+    
     #A match in both sequences
     PAIRWISE_MATCH = 0
     #A deletion in the query sequence (seq 1)
@@ -954,12 +1146,25 @@ class PairwiseAlignment:
         self.score = score
         self.operationList = operationList
         
-        i = sum([ oP.length for oP in operationList if oP.type != PairwiseAlignment.PAIRWISE_INDEL_Y ])
-        assert i == abs(end1 - start1) #Check alignment is of right length with respect to the query
-        
-        i = sum([ oP.length for oP in operationList if oP.type != PairwiseAlignment.PAIRWISE_INDEL_X ])
-        assert i == abs(end2 - start2) #Check alignment is of right length with respect to the target
+        if __debug__: #Sum the lengths of the query and target in one pass, skipped when run with -O
+            i = j = 0
+            indelY, indelX = PairwiseAlignment.PAIRWISE_INDEL_Y, PairwiseAlignment.PAIRWISE_INDEL_X
+            for oP in operationList:
+                opType, length = oP.type, oP.length
+                if opType != indelY:
+                    i += length
+                if opType != indelX:
+                    j += length
+            assert i == abs(end1 - start1) #Check alignment is of right length with respect to the query
+            assert j == abs(end2 - start2) #Check alignment is of right length with respect to the target
         
+    def __getstate__(self): #Pickling with protocols 0 and 1 needs this, as the class has slots
+        return [ getattr(self, i) for i in PairwiseAlignment.__slots__ ]
+    
+    def __setstate__(self, state):
+        for i, j in zip(PairwiseAlignment.__slots__, state):
+            setattr(self, i, j)
+    
     def __eq__(self, pairwiseAlignment):
         if pairwiseAlignment is None:
             return False
@@ -971,60 +1176,67 @@ class PairwiseAlignment:
         self.start2 == pairwiseAlignment.start2 and \
         self.end2 == pairwiseAlignment.end2 and \
         self.strand2 == pairwiseAlignment.strand2 and \
-        close(self.score, pairwiseAlignment.score, 0.001) and \
+        pairwiseAlignment.score - 0.001 <= self.score <= pairwiseAlignment.score + 0.001 and \
         self.operationList == pairwiseAlignment.operationList
     
+#Maps each cigar operation to its type and whether it is followed by a score
+_CIGAR_OPERATIONS = { 'M':(PairwiseAlignment.PAIRWISE_MATCH, False),
+                      'D':(PairwiseAlignment.PAIRWISE_INDEL_X, False), #a gap in the query
+                      'I':(PairwiseAlignment.PAIRWISE_INDEL_Y, False), #a gap in the target
+                      'X':(PairwiseAlignment.PAIRWISE_MATCH, True),
+                      'Y':(PairwiseAlignment.PAIRWISE_INDEL_X, True), #a gap in the query
+                      'Z':(PairwiseAlignment.PAIRWISE_INDEL_Y, True) } #a gap in the target
+_CIGAR_OPERATION_TYPES = dict((i, j) for i, (j, k) in _CIGAR_OPERATIONS.items())
+_CIGAR_SCORED_OPERATIONS = frozenset(i for i, (j, k) in _CIGAR_OPERATIONS.items() if k)
+_CIGAR_UNSCORED_OPERATIONS = frozenset(i for i, (j, k) in _CIGAR_OPERATIONS.items() if not k)
+#The reverse maps, from operation type to the letter written by cigarWrite
+_CIGAR_SCORED_LETTERS = dict((j, i) for i, (j, k) in _CIGAR_OPERATIONS.items() if k)
+_CIGAR_UNSCORED_LETTERS = dict((j, i) for i, (j, k) in _CIGAR_OPERATIONS.items() if not k)
+    
 def cigarRead(fileHandle):
     """Reads a list of pairwise alignments into a pairwise alignment structure.
     
     Query and target are reversed!
     """
-    #p = re.compile("cigar:\\s+(.+)\\s+([0-9]+)\\s+([0-9]+)\\s+([\\+\\-\\.])\\s+(.+)\\s+([0-9]+)\\s+([0-9]+)\\s+([\\+\\-\\.])\\s+(.+)\\s+(.*)\\s*)*")
-    p = re.compile("cigar:\\s+(.+)\\s+([0-9]+)\\s+([0-9]+)\\s+([\\+\\-\\.])\\s+(.+)\\s+([0-9]+)\\s+([0-9]+)\\s+([\\+\\-\\.])\\s+([^\\s]+)(\\s+(.*)\\s*)*")
-    line = fileHandle.readline()
-    while line != '':
-        i = p.match(line)
-        if i is not None:
-            m = i.groups()
-            if len(m) == 11:
-                l = m[10].split(" ")
-                ops = []
-                if l != ['']:
-                    j = 0
-                    while j < len(l):
-                        if l[j] == 'M':
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_MATCH, int(l[j+1]), 0.0))
-                            j += 2
-                        elif l[j] == 'D':
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_INDEL_X, int(l[j+1]), 0.0)) #a gap in the query
-                            j += 2
-                        elif l[j] == 'I':
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_INDEL_Y, int(l[j+1]), 0.0)) #a gap in the target
-                            j += 2
-                        elif l[j] == 'X':
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_MATCH, int(l[j+1]), float(l[j+2])))
-                            j += 3
-                        elif l[j] == 'Y':
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_INDEL_X, int(l[j+1]), float(l[j+2]))) #a gap in the query
-                            j += 3
-                        else:
-                            assert l[j] == 'Z'
-                            ops.append(AlignmentOperation(PairwiseAlignment.PAIRWISE_INDEL_Y, int(l[j+1]), float(l[j+2]))) #a gap in the target
-                            j += 3
+    #Local names are quicker to look up in the operation parsing loop
+    cigarOperations = _CIGAR_OPERATIONS
+    opTypeFn = _CIGAR_OPERATION_TYPES.__getitem__
+    alignmentOperation = AlignmentOperation
+    for line in fileHandle:
+        m = line.split()
+        if len(m) >= 10 and m[0] == "cigar:":
+            l = m[10:]
+            k = len(l)
+            #Lines in which either none or all of the operations have scores (as written by 
+            #cigarWrite) are converted by slicing the columns of tokens, using map to 
+            #do the conversions, rather than op by op in the interpreter.
+            if k % 2 == 0 and _CIGAR_UNSCORED_OPERATIONS.issuperset(l[0::2]):
+                ops = map(alignmentOperation, map(opTypeFn, l[0::2]), map(int, l[1::2]), [ 0.0 ]*(k/2))
+            elif k % 3 == 0 and _CIGAR_SCORED_OPERATIONS.issuperset(l[0::3]):
+                ops = map(alignmentOperation, map(opTypeFn, l[0::3]), map(int, l[1::3]), map(float, l[2::3]))
             else:
                 ops = []
+                append = ops.append
+                j = 0
+                while j < k:
+                    opType, hasScore = cigarOperations[l[j]]
+                    if hasScore:
+                        append(alignmentOperation(opType, int(l[j+1]), float(l[j+2])))
+                        j += 3
+                    else:
+                        append(alignmentOperation(opType, int(l[j+1]), 0.0))
+                        j += 2
             
-            assert m[3] == '+' or m[3] == '-'
-            strand1 = m[3] == '+'
+            assert m[4] == '+' or m[4] == '-'
+            strand1 = m[4] == '+'
             
-            assert m[7] == '+' or m[7] == '-'
-            strand2 = m[7] == '+'
+            assert m[8] == '+' or m[8] == '-'
+            strand2 = m[8] == '+'
             
-            start1, end1 = int(m[1]), int(m[2])
-            start2, end2 = int(m[5]), int(m[6])
+            start1, end1 = int(m[2]), int(m[3])
+            start2, end2 = int(m[6]), int(m[7])
             
-            yield PairwiseAlignment(m[4], start2, end2, strand2, m[0], start1, end1, strand1, float(m[8]), ops)
-        line = fileHandle.readline()
+            yield PairwiseAlignment(m[5], start2, end2, strand2, m[1], start1, end1, strand1, float(m[9]), ops)
 
 def cigarWrite(fileHandle, pairwiseAlignment, withProbs=True):
     """Writes out the pairwiseAlignment to the file stream.
@@ -1042,37 +1254,42 @@ def cigarWrite(fileHandle, pairwiseAlignment, withProbs=True):
     if not pairwiseAlignment.strand2:
         strand2 = "-"
         
-    fileHandle.write("cigar: %s %i %i %s %s %i %i %s %f" % (pairwiseAlignment.contig2, pairwiseAlignment.start2, pairwiseAlignment.end2, strand2,\
-                                                            pairwiseAlignment.contig1, pairwiseAlignment.start1, pairwiseAlignment.end1, strand1,\
-                                                            pairwiseAlignment.score))
+    parts = [ "cigar: %s %i %i %s %s %i %i %s %f" % (pairwiseAlignment.contig2, pairwiseAlignment.start2, pairwiseAlignment.end2, strand2,\
+                                                     pairwiseAlignment.contig1, pairwiseAlignment.start1, pairwiseAlignment.end1, strand1,\
+                                                     pairwiseAlignment.score) ]
     if withProbs == True:
-        hashMap = { PairwiseAlignment.PAIRWISE_INDEL_Y:'Z',PairwiseAlignment.PAIRWISE_INDEL_X:'Y', PairwiseAlignment.PAIRWISE_MATCH:'X' }
-        for op in pairwiseAlignment.operationList:
-            fileHandle.write(' %s %i %f' % (hashMap[op.type], op.length, op.score))
+        hashMap = _CIGAR_SCORED_LETTERS
+        parts += [ ' %s %i %f' % (hashMap[op.type], op.length, op.score) for op in pairwiseAlignment.operationList ]
     else:
-        hashMap = { PairwiseAlignment.PAIRWISE_INDEL_Y:'I',PairwiseAlignment.PAIRWISE_INDEL_X:'D', PairwiseAlignment.PAIRWISE_MATCH:'M' }
-        for op in pairwiseAlignment.operationList:
-            fileHandle.write(' %s %i' % (hashMap[op.type], op.length))
-    fileHandle.write("\n")
+        hashMap = _CIGAR_UNSCORED_LETTERS
+        parts += [ ' %s %i' % (hashMap[op.type], op.length) for op in pairwiseAlignment.operationList ]
+    parts.append("\n")
+    fileHandle.write("".join(parts))
     
+_RANDOM_CONTIGS = ( "one", "two", "three", "four" )
+
 def _getRandomSegment():
-    contig = random.choice([ "one", "two", "three", "four" ])
-    start = random.choice(xrange(0, 10000))
-    end = start + random.choice(xrange(0, 1000))
-    strand = random.choice([ True, False ])
+    contig = random.choice(_RANDOM_CONTIGS)
+    start = random.randrange(0, 10000)
+    end = start + random.randrange(0, 1000)
+    strand = random.random() < 0.5
     if not strand:
         start, end = end, start
     return contig, start, end, strand
 
+_RANDOM_OPERATION_TYPES = ( PairwiseAlignment.PAIRWISE_INDEL_Y, PairwiseAlignment.PAIRWISE_INDEL_X, PairwiseAlignment.PAIRWISE_MATCH )
+
 def getRandomOperationList(xLength, yLength, operationMaxLength=100):
     assert operationMaxLength >= 1
     operationList = []
+    #Type and length are drawn together from a single random number: the
+    #low "digit" (base 3) picks the type, the rest picks the length.
+    rand = random.random
+    choices = 3 * max(1, operationMaxLength - 1)
     while xLength > 0 or yLength > 0:
-        opType = random.choice([ PairwiseAlignment.PAIRWISE_INDEL_Y, PairwiseAlignment.PAIRWISE_INDEL_X, PairwiseAlignment.PAIRWISE_MATCH ])
-        if operationMaxLength == 1:
-            length = 1
-        else:
-            length = random.choice(xrange(1, operationMaxLength))
+        i = int(rand() * choices)
+        opType = _RANDOM_OPERATION_TYPES[i % 3]
+        length = 1 + i // 3
         if opType != PairwiseAlignment.PAIRWISE_INDEL_Y and xLength - length < 0:
             continue
         if opType != PairwiseAlignment.PAIRWISE_INDEL_X and yLength - length < 0:
@@ -1081,7 +1298,7 @@ def getRandomOperationList(xLength, yLength, operationMaxLength=100):
             xLength -= length
         if opType != PairwiseAlignment.PAIRWISE_INDEL_X:
             yLength -= length    
-        operationList.append(AlignmentOperation(opType, length, random.random()))
+        operationList.append(AlignmentOperation(opType, length, rand()))
         assert xLength >= 0 and yLength >= 0
     return operationList
         
@@ -1090,7 +1307,7 @@ def getRandomPairwiseAlignment():
     """
     i, j, k, l = _getRandomSegment()
     m, n, o, p = _getRandomSegment()
-    score = random.choice(xrange(-1000, 1000))
+    score = random.randrange(-1000, 1000)
     return PairwiseAlignment(i, j, k, l, m, n, o, p, score, getRandomOperationList(abs(k - j), abs(o - n)))
 
 #########################################################
@@ -1104,20 +1321,24 @@ def getRandomPairwiseAlignment():
 def addNodeToGraph(nodeName, graphFileHandle, label, width=0.3, height=0.3, shape="circle", colour="black", fontsize=14):
     """Adds a node to the graph.
     """
-    graphFileHandle.write("node[width=%s,height=%s,shape=%s,colour=%s,fontsize=%s];\n" % (width, height, shape, colour, fontsize))
-    graphFileHandle.write("%s [label=\"%s\"];\n" % (nodeName, label))
+    graphFileHandle.write("node[width=%s,height=%s,shape=%s,colour=%s,fontsize=%s];\n%s [label=\"%s\"];\n" % (width, height, shape, colour, fontsize, nodeName, label))
+
+def addNodesToGraph(nodes, graphFileHandle, width=0.3, height=0.3, shape="circle", colour="black", fontsize=14):
+    """Adds a sequence of (nodeName, label) pairs to the graph, all with the same style, in one write.
+    """
+    parts = [ "node[width=%s,height=%s,shape=%s,colour=%s,fontsize=%s];\n" % (width, height, shape, colour, fontsize) ]
+    parts += [ "%s [label=\"%s\"];\n" % (nodeName, label) for nodeName, label in nodes ]
+    graphFileHandle.write("".join(parts))
 
 def addEdgeToGraph(parentNodeName, childNodeName, graphFileHandle, colour="black", length="10", weight="1", dir="none"):
     """Links two nodes in the graph together.
     """
-    graphFileHandle.write("edge[color=%s,len=%s,weight=%s,dir=%s];\n" % (colour, length, weight, dir))
-    graphFileHandle.write("%s -- %s;\n" % (parentNodeName, childNodeName))
+    graphFileHandle.write("edge[color=%s,len=%s,weight=%s,dir=%s];\n%s -- %s;\n" % (colour, length, weight, dir, parentNodeName, childNodeName))
 
 def setupGraphFile(graphFileHandle):
     """Sets up the dot file.
     """
-    graphFileHandle.write("graph G {\n")
-    graphFileHandle.write("overlap=false\n")
+    graphFileHandle.write("graph G {\noverlap=false\n")
     logger.info("Starting to write the graph")
 
 def finishGraphFile(graphFileHandle):
@@ -10,6 +10,10 @@ import os
 import sys
 import random
 import math
+import signal
+import threading
+import time
+import tarfile
 
 from bioio import getTempFile
 from bioio import getTempDirectory
@@ -19,6 +23,10 @@ from bioio import getRandomAlphaNumericString
 from bioio import fastaRead
 from bioio import fastaWrite
 from bioio import getRandomSequence
+from bioio import reverseComplement
+from bioio import mutateSequence
+from bioio import fastaAlignmentRead
+from bioio import fastaAlignmentWrite
 
 from bioio import pWMRead
 from bioio import pWMWrite
@@ -34,7 +42,11 @@ from bioio import getRandomPairwiseAlignment
 from sonLib.bioio import TestStatus
 
 from bioio import system
+from bioio import popenCatch
 from bioio import logger
+from bioio import addLoggingFileHandler
+from bioio import spawnDaemon
+from bioio import saveInputs
 
 class TestCase(unittest.TestCase):
     
@@ -50,6 +62,119 @@ class TestCase(unittest.TestCase):
         for tempFile in self.tempFiles:
             os.remove(tempFile)
             
+    #########################################################
+    #########################################################
+    #########################################################
+    #system wrapper functions
+    #########################################################
+    #########################################################
+    #########################################################
+    
+    def testSystem(self):
+        system([ "true" ])
+        system("true && true")
+        try:
+            system([ "false" ])
+            assert False
+        except RuntimeError:
+            logger.debug("Got expected error message")
+        assert popenCatch([ "echo", "hello  world" ]) == "hello  world\n"
+        assert popenCatch("echo hello  world") == "hello world\n"
+        assert popenCatch([ "cat" ], stdinString="hello") == "hello"
+    
+    def testAddLoggingFileHandler(self):
+        tempFile = getTempFile()
+        self.tempFiles.append(tempFile)
+        handler = addLoggingFileHandler(tempFile)
+        try:
+            for i in xrange(100):
+                logger.critical("Logging line %i", i)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        fileHandle = open(tempFile, 'r')
+        assert fileHandle.readlines() == [ "Logging line %i\n" % i for i in xrange(100) ]
+        fileHandle.close()
+    
+    def testAddLoggingFileHandler_Fork(self):
+        tempFile = getTempFile()
+        self.tempFiles.append(tempFile)
+        handler = addLoggingFileHandler(tempFile)
+        try:
+            assert handler.baseFilename == os.path.abspath(tempFile)
+            for fork in xrange(20):
+                #Fork while the writer thread is busy and, to always hit the race, while 
+                #another thread holds the file handler's lock. The child must not block on it
+                for i in xrange(200):
+                    logger.critical("Parent line")
+                locked, forked = threading.Event(), threading.Event()
+                def holdLock():
+                    handler.handler.acquire()
+                    locked.set()
+                    forked.wait()
+                    handler.handler.release()
+                thread = threading.Thread(target=holdLock)
+                thread.start()
+                locked.wait()
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        signal.alarm(10)
+                        logger.critical("Child line")
+                    finally:
+                        os._exit(0)
+                forked.set()
+                thread.join()
+                assert os.waitpid(pid, 0)[1] == 0
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        fileHandle = open(tempFile, 'r')
+        lines = fileHandle.readlines()
+        fileHandle.close()
+        assert lines.count("Child line\n") == 20
+        assert lines.count("Parent line\n") >= 20*200
+    
+    def testSpawnDaemon(self):
+        #The quoted argument holds a path with a space in it, which must reach sh as one argument
+        tempFile = os.path.join(os.path.abspath(self.tempDir), "daemon output")
+        startTime = time.time()
+        spawnDaemon("sh -c 'sleep 1; touch \"%s\"'" % tempFile)
+        assert time.time() - startTime < 1.0 #Returns without waiting for the daemon
+        assert not os.path.exists(tempFile)
+        while not os.path.exists(tempFile):
+            assert time.time() - startTime < 30
+            time.sleep(0.1)
+    
+    def testSaveInputs(self):
+        inputDir = getTempDirectory(self.tempDir)
+        savedInputsDir = getTempDirectory(self.tempDir)
+        inputFile = os.path.join(inputDir, "input.txt")
+        fileHandle = open(inputFile, 'w')
+        fileHandle.write("hello\nworld\n")
+        fileHandle.close()
+        inputSubDir = os.path.join(inputDir, "subDir")
+        os.mkdir(inputSubDir)
+        open(os.path.join(inputSubDir, "file"), 'w').close()
+        
+        copiedFile, copiedDir = saveInputs(savedInputsDir, [ inputFile, inputSubDir ])
+        assert copiedFile == os.path.join(savedInputsDir, "input.txt")
+        fileHandle = open(copiedFile, 'r')
+        assert fileHandle.read() == "hello\nworld\n"
+        fileHandle.close()
+        assert copiedDir == os.path.join(savedInputsDir, "subDir.tar")
+        tarFile = tarfile.open(copiedDir, 'r')
+        assert sorted(tarFile.getnames()) == [ inputSubDir.lstrip("/"), os.path.join(inputSubDir, "file").lstrip("/") ]
+        tarFile.close()
+        
+        #A missing input raises and leaves no partial tar behind
+        try:
+            saveInputs(savedInputsDir, [ os.path.join(inputDir, "missing") ])
+            assert False
+        except OSError:
+            logger.debug("Got expected error message")
+        assert sorted(os.listdir(savedInputsDir)) == [ "input.txt", "subDir.tar" ]
+    
     #########################################################
     #########################################################
     #########################################################
@@ -145,6 +270,42 @@ class TestCase(unittest.TestCase):
                 fastaWrite(sys.stdout, name, seq)
             fileHandle.close()
             
+    def testFastaReadWhiteSpaceAndComments(self):
+        tempFile = getTempFile()
+        self.tempFiles.append(tempFile)
+        fileHandle = open(tempFile, 'w')
+        fileHandle.write("# a comment\n>one\nAC GT\n#another comment\nac\tgt\r\n>two\n\n>three\nNN--\nA")
+        fileHandle.close()
+        fileHandle = open(tempFile, 'r')
+        assert list(fastaRead(fileHandle)) == [ ("one", "ACGTacgt"), ("two", ""), ("three", "NN--A") ]
+        fileHandle.close()
+
+    def testFastaAlignmentReadWrite(self):
+        tempFile = getTempFile()
+        self.tempFiles.append(tempFile)
+        for test in xrange(0, self.testNo):
+            seqNo = random.choice(xrange(1, 10))
+            columnNo = random.choice(xrange(200))
+            names = [ "seq%i" % i for i in xrange(seqNo) ]
+            columns = [ [ random.choice("ACTGN-") for j in xrange(seqNo) ] for i in xrange(columnNo) ]
+            fastaAlignmentWrite(columns, names, seqNo, tempFile)
+            assert list(fastaAlignmentRead(tempFile)) == columns
+            assert list(fastaAlignmentRead(tempFile, mapFn=lambda x : x.lower())) == [ column[:1] + [ i.lower() for i in column[1:] ] for column in columns ]
+            
+    def testMutateSequence(self):
+        for test in xrange(0, self.testNo):
+            name, seq = getRandomSequence()
+            assert mutateSequence(seq, 0.0) == seq
+            mutatedSeq = mutateSequence(seq, random.random())
+            assert set(mutatedSeq) <= set("ACTGN")
+    
+    def testReverseComplement(self):
+        assert reverseComplement("ACGTNacgtn-") == "-nacgtNACGT"
+        assert reverseComplement(u"ACGTNacgtn-") == u"-nacgtNACGT"
+        for test in xrange(0, self.testNo):
+            name, seq = getRandomSequence()
+            assert reverseComplement(reverseComplement(seq)) == seq
+    
     def testFastaReadWriteC(self):
         """Tests consistency with C version of this function.
         """
@@ -199,6 +360,18 @@ class TestCase(unittest.TestCase):
             tree3 = printBinaryTree(tree2, True) 
             logger.debug("tree found\t", tree3)
             assert tree == tree3
+    
+    def testNewickTreeParser_DeepTree(self):
+        #trees deeper than the recursion limit
+        depth = 2*sys.getrecursionlimit()
+        treeString = "(a,"*depth + "b" + ")"*depth + ";"
+        tree = newickTreeParser(treeString)
+        assert printBinaryTree(tree, False) == treeString
+        for i in xrange(depth):
+            assert tree.internal
+            assert tree.left.iD == "a"
+            tree = tree.right
+        assert not tree.internal and tree.iD == "b"
             
     #########################################################
     #########################################################
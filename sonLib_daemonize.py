@@ -44,6 +44,7 @@ import sys
 import resource
 import signal
 import subprocess
+import shlex
 from sonLib.bioio import system
 
 # Default daemon parameters.
@@ -99,5 +100,5 @@ if __name__ == '__main__':
     os.dup2(0, 1)            # standard output (1)
     os.dup2(0, 2)            # standard error (2)
     
-    retVal = subprocess.call(sys.argv[1].split(), shell=False, bufsize=-1)
+    retVal = subprocess.call(shlex.split(sys.argv[1]), shell=False, bufsize=-1)
     sys.exit(retVal) 
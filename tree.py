@@ -9,6 +9,7 @@ import os
 import re
 import math
 import random
+import array
 
 from sonLib.misc import close
 #import bioio
@@ -119,6 +120,48 @@ def getDistanceMatrix(tree):
     fn(tree)       
     return m
 
+def binaryTree_toArrays(binaryTree):
+    """
+    flattens the tree into parallel arrays indexed by node number. nodes are
+    numbered in pre-order from the root (0), so a parent always precedes its
+    children and walking the numbers backwards is a post-order traversal.
+    returns a dict of 'left', 'right' and 'parent' node numbers (-1 if absent),
+    'distance' (as arrays) and 'internal' and 'iD' (as lists)
+    """
+    left = array.array('l')
+    right = array.array('l')
+    parent = array.array('l')
+    distance = array.array('d')
+    internal = []
+    iD = []
+    stack = [ (binaryTree, -1, left) ] #Nodes still to number, with their parent and the parent's child array
+    while len(stack) > 0:
+        binaryTree, i, children = stack.pop()
+        j = len(iD)
+        if i != -1:
+            children[i] = j
+        left.append(-1)
+        right.append(-1)
+        parent.append(i)
+        distance.append(binaryTree.distance)
+        internal.append(binaryTree.internal)
+        iD.append(binaryTree.iD)
+        if binaryTree.right is not None:
+            stack.append((binaryTree.right, j, right))
+        if binaryTree.left is not None:
+            stack.append((binaryTree.left, j, left))
+    return { 'left':left, 'right':right, 'parent':parent, 'distance':distance, 'internal':internal, 'iD':iD }
+
+def binaryTree_fromArrays(arrays):
+    """
+    rebuilds the tree from the arrays made by binaryTree_toArrays, returning its root
+    """
+    left, right, distance, internal, iD = arrays['left'], arrays['right'], arrays['distance'], arrays['internal'], arrays['iD']
+    nodes = [ None ]*len(iD)
+    for i in xrange(len(iD)-1, -1, -1): #Children are numbered after their parents, so are built first
+        j, k = left[i], right[i]
+        nodes[i] = BinaryTree(distance[i], internal[i], nodes[j] if j != -1 else None, nodes[k] if k != -1 else None, iD[i])
+    return nodes[0]
 
 def makeRandomBinaryTree(leafNodeNumber=None):
     """Creates a random binary tree.
@@ -11,6 +11,9 @@ from tree import remodelTreeRemovingRoot
 from tree import binaryTree_depthFirstNumbers
 from tree import mapTraversalIDsBetweenTrees
 from tree import BinaryTree
+from tree import binaryTree_toArrays
+from tree import binaryTree_fromArrays
+from tree import makeRandomBinaryTree
 from bioio import printBinaryTree
 from bioio import newickTreeParser
 from misc import close
@@ -147,6 +150,17 @@ class TestCase(unittest.TestCase):
             print "rootedGeneTree", rootedGeneString, dupCount, lossCount, printBinaryTree(rootedGeneTree2, False)
             #assert printBinaryTree(rootedGeneTree, False) == printBinaryTree(rootedGeneTree2, False)
     
+    def testBinaryTreeArrays(self):
+        for test in xrange(0, self.testNo):
+            tree = makeRandomBinaryTree()
+            arrays = binaryTree_toArrays(tree)
+            for i in xrange(1, len(arrays['iD'])):
+                assert arrays['parent'][i] < i
+                assert i in (arrays['left'][arrays['parent'][i]], arrays['right'][arrays['parent'][i]])
+            assert printBinaryTree(binaryTree_fromArrays(arrays), True) == printBinaryTree(tree, True)
+        tree = newickTreeParser("((a:1,(b:2)c:3)d:4,e:5);", reportUnaryNodes=True)
+        assert printBinaryTree(binaryTree_fromArrays(binaryTree_toArrays(tree)), True) == printBinaryTree(tree, True)
+        
     def testCalculateProbableRootOfGeneTree(self):
         for test in xrange(0, self.testNo):
             speciesTree = getRandomTree()